@@ -1,8 +1,7 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
-import plotly.figure_factory as ff
-from sklearn.preprocessing import StandardScaler
 
 # --- Configuração da Página ---
 st.set_page_config(page_title="📊 Dashboard Mobile BI", layout="wide")
@@ -10,9 +9,23 @@ st.markdown("## 📱 Dashboard de Uso de Dispositivos Móveis e Comportamento de
 st.markdown("---")
 
 # --- Carregamento dos Dados (com cache para performance) ---
+# Tipos compactos aplicados já na leitura: categorias para textos de baixa
+# cardinalidade e float32 para as métricas contínuas
+csv_dtypes = {
+    "Operating System": "category",
+    "Gender": "category",
+    "Device Model": "category",
+    "App Usage Time (min/day)": "float32",
+    "Screen On Time (hours/day)": "float32",
+    "Battery Drain (mAh/day)": "float32",
+    "Data Usage (MB/day)": "float32",
+}
+# Colunas inteiras são reduzidas só depois da imputação (NaN não cabe em int8)
+int_cols = ["User Behavior Class", "Age", "Number of Apps Installed"]
+
 @st.cache_data
 def load_data():
-    df = pd.read_csv("user_behavior_dataset.csv")
+    df = pd.read_csv("user_behavior_dataset.csv", dtype=csv_dtypes)
 
     
     # pré - processamento
@@ -22,6 +35,10 @@ def load_data():
     cat_cols = df.select_dtypes(include=['object', 'category']).columns
     df[cat_cols] = df[cat_cols].fillna(df[cat_cols].mode().iloc[0])
 
+    # Reduz os inteiros para o menor tipo que comporta os valores (ex: int8)
+    for col in int_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast="integer")
 
     return df
 
@@ -39,20 +56,40 @@ if missing_cols:
     st.error(f"Erro Crítico: As seguintes colunas obrigatórias estão ausentes no seu arquivo CSV: {', '.join(missing_cols)}")
     st.stop()
 
+# --- Estatísticas das Colunas (calculadas uma única vez) ---
+numeric_cols = ['App Usage Time (min/day)', 'Screen On Time (hours/day)', 'Battery Drain (mAh/day)', 'Number of Apps Installed', 'Data Usage (MB/day)', 'Age']
+category_cols = ["Operating System", "Gender", "User Behavior Class", "Device Model"]
+
+# Limites fixos das faixas etárias (mesmo tipo int8 da coluna Age) e o dtype
+# categórico dos rótulos
+age_edges = np.array([20, 30, 40, 50], dtype=np.int8)
+age_labels = ['Até 20', '21-30', '31-40', '41-50', 'Acima de 50']
+age_group_dtype = pd.CategoricalDtype(age_labels)
+
+@st.cache_data
+def column_stats():
+    # (min, max) das colunas numéricas e valores únicos das categóricas
+    data = load_data()
+    stats = {col: (float(data[col].min()), float(data[col].max())) for col in numeric_cols}
+    stats.update({col: data[col].unique().tolist() for col in category_cols})
+    stats["User Behavior Class"] = sorted(stats["User Behavior Class"])
+    return stats
+
+stats = column_stats()
+
 # --- Barra Lateral de Filtros ---
 st.sidebar.header("🎛️ Filtros Interativos")
 
 # Filtros Categóricos
-os_options = st.sidebar.multiselect("Sistema Operacional", df["Operating System"].unique(), default=df["Operating System"].unique())
-gender_options = st.sidebar.multiselect("Gênero", df["Gender"].unique(), default=df["Gender"].unique())
-class_options = st.sidebar.multiselect("Classe Comportamental", sorted(df["User Behavior Class"].unique()), default=sorted(df["User Behavior Class"].unique()))
-model_options = st.sidebar.multiselect("Modelo de Dispositivo", df["Device Model"].unique(), default=df["Device Model"].unique())
+os_options = st.sidebar.multiselect("Sistema Operacional", stats["Operating System"], default=stats["Operating System"])
+gender_options = st.sidebar.multiselect("Gênero", stats["Gender"], default=stats["Gender"])
+class_options = st.sidebar.multiselect("Classe Comportamental", stats["User Behavior Class"], default=stats["User Behavior Class"])
+model_options = st.sidebar.multiselect("Modelo de Dispositivo", stats["Device Model"], default=stats["Device Model"])
 
 # Filtros Numéricos (Sliders)
 st.sidebar.subheader("📉 Intervalos Numéricos")
 def create_slider(column_name, label):
-    min_val = float(df[column_name].min())
-    max_val = float(df[column_name].max())
+    min_val, max_val = stats[column_name]
     return st.sidebar.slider(label, min_val, max_val, (min_val, max_val))
 
 usage_range = create_slider("App Usage Time (min/day)", "Uso de App (min/dia)")
@@ -64,45 +101,84 @@ age_range = create_slider("Age", "Idade")
 
 
 # --- Aplicação dos Filtros no DataFrame ---
-filtered_df = df[
-    df["Operating System"].isin(os_options) &
-    df["Gender"].isin(gender_options) &
-    df["User Behavior Class"].isin(class_options) &
-    df["Device Model"].isin(model_options) &
-    df["App Usage Time (min/day)"].between(*usage_range) &
-    df["Screen On Time (hours/day)"].between(*screen_range) &
-    df["Battery Drain (mAh/day)"].between(*batt_range) &
-    df["Number of Apps Installed"].between(*apps_range) &
-    df["Data Usage (MB/day)"].between(*data_range) &
-    df["Age"].between(*age_range)
-]
+def build_mask(data, options_by_col, ranges_by_col):
+    # Uma única máscara NumPy reduzida in-place, sem Series intermediárias
+    mask = np.ones(len(data), dtype=bool)
+    for col, options in options_by_col.items():
+        mask &= data[col].isin(frozenset(options)).to_numpy()
+    for col, (low, high) in ranges_by_col.items():
+        values = data[col].to_numpy()
+        mask &= values >= low
+        mask &= values <= high
+    return mask
+
+# Limite de entradas dos caches indexados pelos filtros: a chave inclui valores
+# contínuos dos sliders, então sem limite o cache cresceria indefinidamente
+filter_cache_entries = 64
+
+@st.cache_data(max_entries=filter_cache_entries)
+def filter_mask(filter_key):
+    # filter_key: pares (coluna, seleção) das categóricas e (coluna, intervalo)
+    # das numéricas. Em cache: a mesma máscara serve ao script e a todos os gráficos
+    options_by_col, ranges_by_col = filter_key
+    return build_mask(load_data(), dict(options_by_col), dict(ranges_by_col))
+
+# Chave hashável e barata dos filtros, usada pelos cálculos em cache dos gráficos
+filter_key = (
+    (
+        ("Operating System", tuple(sorted(os_options))),
+        ("Gender", tuple(sorted(gender_options))),
+        ("User Behavior Class", tuple(sorted(class_options))),
+        ("Device Model", tuple(sorted(model_options))),
+    ),
+    (
+        ("App Usage Time (min/day)", usage_range),
+        ("Screen On Time (hours/day)", screen_range),
+        ("Battery Drain (mAh/day)", batt_range),
+        ("Number of Apps Installed", apps_range),
+        ("Data Usage (MB/day)", data_range),
+        ("Age", age_range),
+    ),
+)
+mask = filter_mask(filter_key)
 
 # Mensagem de aviso se nenhum dado corresponder aos filtros
-if filtered_df.empty:
+# (verificado na máscara, antes de materializar o DataFrame filtrado)
+if not mask.any():
     st.warning("Nenhum dado encontrado com os filtros aplicados. Por favor, ajuste os filtros.")
     st.stop()
 
+filtered_df = df[mask]
+
 # --- KPIs Principais (Visão Geral) ---
 st.markdown("### 📌 Visão Geral da Seleção Atual")
+# As quatro médias numa única redução NumPy sobre um bloco float32
+kpi_cols = ['App Usage Time (min/day)', 'Screen On Time (hours/day)', 'Data Usage (MB/day)', 'Number of Apps Installed']
+avg_usage, avg_screen, avg_data, avg_apps = filtered_df[kpi_cols].to_numpy(dtype=np.float32).mean(axis=0, dtype=np.float64)
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("📱 Uso Médio de App", f"{filtered_df['App Usage Time (min/day)'].mean():.1f} min")
-col2.metric("🕒 Média de Tela Ativa", f"{filtered_df['Screen On Time (hours/day)'].mean():.1f} h")
-col3.metric("🌐 Consumo Médio de Dados", f"{filtered_df['Data Usage (MB/day)'].mean():.1f} MB")
-col4.metric("📦 Média de Apps Instalados", f"{filtered_df['Number of Apps Installed'].mean():.1f}")
+col1.metric("📱 Uso Médio de App", f"{avg_usage:.1f} min")
+col2.metric("🕒 Média de Tela Ativa", f"{avg_screen:.1f} h")
+col3.metric("🌐 Consumo Médio de Dados", f"{avg_data:.1f} MB")
+col4.metric("📦 Média de Apps Instalados", f"{avg_apps:.1f}")
 
 st.markdown("---")
 
 # --- Seção de Gráficos ---
 
+# Contagens pré-agregadas: o Plotly recebe uma linha por categoria, não por usuário
+def category_counts(column):
+    counts = filtered_df[column].value_counts()
+    return counts[counts > 0].rename_axis(column).reset_index(name="count")
+
 with st.expander("📊 Distribuições e Proporções", expanded=False):
     c1, c2 = st.columns(2)
     with c1:
-        fig_os = px.pie(filtered_df, names="Operating System", title="Distribuição por SO", hole=0.3,
+        fig_os = px.pie(category_counts("Operating System"), names="Operating System", values="count", title="Distribuição por SO", hole=0.3,
                         color_discrete_sequence=px.colors.sequential.Plasma)
         fig_os.update_traces(textposition='inside', textinfo='percent+label')
         st.plotly_chart(fig_os, use_container_width=True)
     with c2:
-        fig_class = px.pie(filtered_df, names="User Behavior Class", title="Distribuição por Classe Comportamental", hole=0.3,
+        fig_class = px.pie(category_counts("User Behavior Class"), names="User Behavior Class", values="count", title="Distribuição por Classe Comportamental", hole=0.3,
                            color_discrete_sequence=px.colors.sequential.Viridis)
         fig_class.update_traces(textposition='inside', textinfo='percent+label')
         st.plotly_chart(fig_class, use_container_width=True)
@@ -112,10 +188,11 @@ with st.expander("📊 Distribuições e Proporções", expanded=False):
 # 1. Análise Comparativa por Classe
 st.markdown("### 🆚 Análise Comparativa por Classe de Comportamento")
 col1, col2 = st.columns(2)
-class_compare_1 = col1.selectbox("Selecione a primeira classe para comparar:", sorted(df["User Behavior Class"].unique()), index=0)
-class_compare_2 = col2.selectbox("Selecione a segunda classe para comparar:", sorted(df["User Behavior Class"].unique()), index=len(df["User Behavior Class"].unique())-1)
+class_values = stats["User Behavior Class"]
+class_compare_1 = col1.selectbox("Selecione a primeira classe para comparar:", class_values, index=0)
+class_compare_2 = col2.selectbox("Selecione a segunda classe para comparar:", class_values, index=len(class_values)-1)
 
-compare_df = filtered_df[filtered_df["User Behavior Class"].isin([class_compare_1, class_compare_2])]
+compare_df = filtered_df[filtered_df["User Behavior Class"].isin(frozenset((class_compare_1, class_compare_2)))]
 
 if not compare_df.empty:
     metrics_to_compare = ['Data Usage (MB/day)', 'Number of Apps Installed', 'Battery Drain (mAh/day)']
@@ -155,19 +232,28 @@ with st.expander("⚔️ Análise de Comportamento: iOS vs. Android", expanded=F
 
 # --- GRÁFICOS SOBRE IDADE SUBSTITUÍDOS ---
 
+@st.cache_data(max_entries=filter_cache_entries)
+def age_group_stats(filter_key):
+    data = load_data()
+    # Projeta só as colunas usadas pelos gráficos de idade antes de aplicar a máscara
+    sub = data.loc[filter_mask(filter_key), ['Age', 'App Usage Time (min/day)', 'Device Model']]
+
+    # Faixa etária calculada uma única vez e compartilhada pelos dois gráficos
+    # (Series à parte: evita copiar o recorte e o SettingWithCopyWarning)
+    # Busca binária vetorizada: até 20 -> 0, 21-30 -> 1, ..., acima de 50 -> 4
+    age_codes = np.searchsorted(age_edges, sub['Age'].to_numpy(), side='left')
+    age_group = pd.Series(pd.Categorical.from_codes(age_codes, dtype=age_group_dtype),
+                          index=sub.index, name='Age Group')
+
+    # Média de uso por grupo de idade e contagem de cada modelo por faixa etária
+    avg_usage_by_age = sub.groupby(age_group, observed=True)['App Usage Time (min/day)'].mean().reset_index()
+    model_counts_by_age = sub.groupby([age_group, 'Device Model'], observed=True).size().reset_index(name='Count')
+    return avg_usage_by_age, model_counts_by_age
+
+avg_usage_by_age, model_counts_by_age = age_group_stats(filter_key)
+
 # 3. Gráfico de Barras: Média de Uso de Apps por Faixa Etária
 with st.expander("⏳ Média de Uso de Apps por Faixa Etária", expanded=True):
-    # Criar uma cópia para evitar o SettingWithCopyWarning
-    df_age_usage = filtered_df.copy()
-    
-    # Definir os intervalos e rótulos para as faixas etárias
-    age_bins = [df_age_usage['Age'].min() - 1, 20, 30, 40, 50, df_age_usage['Age'].max()]
-    age_labels = ['Até 20', '21-30', '31-40', '41-50', 'Acima de 50']
-    df_age_usage['Age Group'] = pd.cut(df_age_usage['Age'], bins=age_bins, labels=age_labels, right=True)
-    
-    # Calcular a média de uso por grupo de idade
-    avg_usage_by_age = df_age_usage.groupby('Age Group')['App Usage Time (min/day)'].mean().reset_index()
-    
     # Criar o gráfico de barras
     fig_bar_age = px.bar(
         avg_usage_by_age,
@@ -182,17 +268,6 @@ with st.expander("⏳ Média de Uso de Apps por Faixa Etária", expanded=True):
 
 # 4. Gráfico de Barras Empilhadas: Modelos de Celular por Faixa Etária
 with st.expander("📱 Modelos de Celular por Faixa Etária", expanded=True):
-    # Criar uma cópia para evitar o SettingWithCopyWarning
-    df_age_model = filtered_df.copy()
-    
-    # Reutilizar os mesmos bins e labels da análise anterior
-    age_bins = [df_age_model['Age'].min() - 1, 20, 30, 40, 50, df_age_model['Age'].max()]
-    age_labels = ['Até 20', '21-30', '31-40', '41-50', 'Acima de 50']
-    df_age_model['Age Group'] = pd.cut(df_age_model['Age'], bins=age_bins, labels=age_labels, right=True)
-
-    # Contar a ocorrência de cada modelo por faixa etária
-    model_counts_by_age = df_age_model.groupby(['Age Group', 'Device Model']).size().reset_index(name='Count')
-
     # Criar o gráfico de barras empilhadas
     fig_stacked_bar = px.bar(
         model_counts_by_age,
@@ -207,11 +282,24 @@ with st.expander("📱 Modelos de Celular por Faixa Etária", expanded=True):
 # --- FIM DA SUBSTITUIÇÃO ---
 
 # 5. Análise de Correlações
+@st.cache_data(max_entries=filter_cache_entries)
+def correlation_matrix(filter_key):
+    data = load_data()
+    # np.corrcoef direto sobre o bloco float32, sem o wrapper do pandas
+    corr_block = data.loc[filter_mask(filter_key), numeric_cols].to_numpy(dtype=np.float32)
+    if len(corr_block) < 2:
+        # Correlação indefinida com menos de duas linhas: NaN, como no DataFrame.corr()
+        corr_values = np.full((len(numeric_cols), len(numeric_cols)), np.nan)
+    else:
+        # Colunas constantes também resultam em NaN, sem avisos de divisão por zero
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr_values = np.corrcoef(corr_block, rowvar=False)
+    return pd.DataFrame(corr_values, index=numeric_cols, columns=numeric_cols)
+
 with st.expander("📈 Correlação entre Variáveis Numéricas", expanded=False):
-    numeric_cols = ['App Usage Time (min/day)', 'Screen On Time (hours/day)', 'Battery Drain (mAh/day)', 'Number of Apps Installed', 'Data Usage (MB/day)', 'Age']
-    corr_matrix = filtered_df[numeric_cols].corr()
+    corr_matrix = correlation_matrix(filter_key)
     
-    fig_heatmap = px.imshow(corr_matrix, text_auto=True, aspect="auto",
+    fig_heatmap = px.imshow(corr_matrix, text_auto=".2f", aspect="auto",
                             color_continuous_scale='RdYlBu',
                             title="Mapa de Calor de Correlações")
     st.plotly_chart(fig_heatmap, use_container_width=True)
@@ -219,8 +307,14 @@ with st.expander("📈 Correlação entre Variáveis Numéricas", expanded=False
 
 # 6. Oportunidades de Marketing por Eficiência
 with st.expander("🎯 Oportunidades de Marketing por Eficiência", expanded=False):
+    # Amostra determinística para limitar o número de pontos enviados ao navegador
+    scatter_max_points = 5000
+    if len(filtered_df) > scatter_max_points:
+        plot_df = filtered_df.sample(n=scatter_max_points, random_state=0)
+    else:
+        plot_df = filtered_df
     fig_scatter = px.scatter(
-        filtered_df,
+        plot_df,
         x="Battery Drain (mAh/day)",
         y="App Usage Time (min/day)",
         color="User Behavior Class",
@@ -252,14 +346,23 @@ st.markdown("### 💡 Insights Dinâmicos da Seleção Atual")
 
 # Cálculo dos insights baseado nos dados filtrados
 # Insight de Eficiência
-filtered_df['Efficiency (h/mAh)'] = filtered_df['Screen On Time (hours/day)'] * 1000 / filtered_df['Battery Drain (mAh/day)']
-eff_model = filtered_df.groupby('Device Model')['Efficiency (h/mAh)'].mean().sort_values(ascending=False).reset_index()
+@st.cache_data(max_entries=filter_cache_entries)
+def efficiency_by_model(filter_key):
+    data = load_data()
+    sub = data.loc[filter_mask(filter_key), ['Device Model', 'Screen On Time (hours/day)', 'Battery Drain (mAh/day)']]
+    # Razão calculada sobre as médias por modelo, sem criar uma coluna nova;
+    # o insight só usa o modelo mais eficiente, então basta o maior valor
+    eff_means = sub.groupby('Device Model', sort=False, observed=True)[['Screen On Time (hours/day)', 'Battery Drain (mAh/day)']].mean()
+    return (eff_means['Screen On Time (hours/day)'] * 1000 / eff_means['Battery Drain (mAh/day)']).nlargest(1).reset_index(name='Efficiency (h/mAh)')
+
+eff_model = efficiency_by_model(filter_key)
 if not eff_model.empty:
     best_eff = eff_model.iloc[0]
     st.success(f"✅ **Maior Eficiência:** Na seleção atual, o **{best_eff['Device Model']}** é o mais eficiente, entregando em média **{best_eff['Efficiency (h/mAh)']:.2f} horas de tela para cada 1000 mAh** de bateria.")
 
 # Insight de Correlação
-corr_usage_battery = filtered_df[['App Usage Time (min/day)', 'Battery Drain (mAh/day)']].corr().iloc[0, 1]
+# Reaproveita a matriz de correlação já calculada para o mapa de calor
+corr_usage_battery = corr_matrix.loc['App Usage Time (min/day)', 'Battery Drain (mAh/day)']
 st.info(f"🔋 **Correlação Forte:** A correlação entre o tempo de uso de apps e o consumo de bateria é de **{corr_usage_battery:.2f}**. Isso confirma que o uso de aplicativos é um grande fator no consumo de energia.")
 
 # Insight da Análise Comparativa